@@ -12,6 +12,11 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 DEFAULT_INITIAL_BALANCE = int(os.getenv("DEFAULT_INITIAL_BALANCE", "0"))
 DEFAULT_DAILY_PRICE = int(os.getenv("DEFAULT_DAILY_PRICE", "25000"))
 
+# Mongo connection-pool knobs for the single shared client in database.py
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+
 # Validate that both values are present
 if not BOT_TOKEN:
     raise RuntimeError("Missing BOT_TOKEN in .env")
@@ -3,6 +3,8 @@
 import os
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.server_api import ServerApi
 from dotenv import load_dotenv
 from datetime import datetime
 import pytz
@@ -13,7 +15,8 @@ MONGODB_URI = os.getenv("MONGODB_URI")
 if not MONGODB_URI:
     raise RuntimeError("MONGODB_URI must be set in your environment or .env")
 
-# Globals
+# Globals — one shared Motor client for the whole process; every module must
+# go through this module so we never multiply connection pools.
 _client = None
 db = None
 users_col = None
@@ -22,15 +25,36 @@ daily_food_choices_col = None
 card_details_col = None
 menu_col = None
 cancelled_lunches_col = None  # <-- new
+blocked_users_col = None  # chat ids that sent Forbidden on broadcast
+
+# name → collection handle, filled in by init_db
+_collections: dict = {}
 
 async def init_db():
     """Initialize MongoDB client, collections, and indexes."""
     global _client, db
-    global users_col, kassa_col, daily_food_choices_col, card_details_col, menu_col, cancelled_lunches_col
-
-    _client = AsyncIOMotorClient(MONGODB_URI)
+    global users_col, kassa_col, daily_food_choices_col, card_details_col, menu_col, cancelled_lunches_col, blocked_users_col
+
+    from config import MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS
+    _client = AsyncIOMotorClient(
+        MONGODB_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=10_000,
+        retryWrites=True,
+        # pin the stable API so server upgrades can't silently change ops
+        server_api=ServerApi("1"),
+        # wire compression; pymongo skips any codec whose package is missing
+        compressors="zstd,snappy,zlib",
+    )
     db = _client["lunch_bot"]
 
+    # Prewarm the pool so the first scheduled job doesn't pay the
+    # TCP+TLS+auth handshake latency.
+    await _client.admin.command("ping")
+
     # core collections
     users_col                  = db["users"]
     kassa_col                  = db["kassa"]
@@ -38,84 +62,97 @@ async def init_db():
     card_details_col           = db["card_details"]
     menu_col                   = db["menu"]
     cancelled_lunches_col      = db["cancelled_lunches"]  # seeded below
-
-    # ─── users collection ─────────────────────
-    await users_col.create_index("telegram_id", unique=True)
-    await users_col.create_index("is_admin")
-    await users_col.create_index("attendance")
-    await users_col.update_many(
-        {"declined_days": {"$exists": False}},
-        {"$set": {"declined_days": []}}
-    )
-
-    # ─── kassa ────────────────────────────────
-    await kassa_col.create_index("date", unique=True)
-
-    # ─── daily_food_choices ──────────────────
-    await daily_food_choices_col.create_index(
-        [("date", 1), ("telegram_id", 1)], unique=True
-    )
+    blocked_users_col          = db["blocked_users"]
+
+    _collections.update({
+        "users":              users_col,
+        "kassa":              kassa_col,
+        "daily_food_choices": daily_food_choices_col,
+        "card_details":       card_details_col,
+        "menu":               menu_col,
+        "cancelled_lunches":  cancelled_lunches_col,
+        "blocked_users":      blocked_users_col,
+    })
 
     # ─── cancelled_lunches ───────────────────
-    # ensure the collection exists and has a unique date index
+    # ensure the collection exists before indexing it
     await cancelled_lunches_col.update_one(
         {"_meta": "init"},
         {"$setOnInsert": {"_meta": "init"}},
         upsert=True
     )
-    await cancelled_lunches_col.create_index("date", unique=True)
-
-    # ─── card_details ────────────────────────
-    await card_details_col.create_index("card_number", unique=True)
 
-    # ─── menu ────────────────────────────────
-    await menu_col.create_index("name", unique=True)
+    # ─── indexes & backfills ─────────────────
+    # independent and idempotent, so fire them concurrently instead of
+    # paying a serial round-trip each on every boot
+    await asyncio.gather(
+        users_col.create_index("telegram_id", unique=True),
+        # compound: the is_admin prefix serves the admin-list filters, and
+        # the telegram_id suffix keeps those scans in index order
+        users_col.create_index([("is_admin", 1), ("telegram_id", 1)]),
+        users_col.create_index("attendance"),
+        # range scan for the debt-check job ({"balance": {"$lt": 0}})
+        users_col.create_index("balance"),
+        users_col.update_many(
+            {"declined_days": {"$exists": False}},
+            {"$set": {"declined_days": []}}
+        ),
+        kassa_col.create_index("date", unique=True),
+        daily_food_choices_col.create_index(
+            [("date", 1), ("telegram_id", 1)], unique=True
+        ),
+        cancelled_lunches_col.create_index("date", unique=True),
+        blocked_users_col.create_index("telegram_id", unique=True),
+        card_details_col.create_index("card_number", unique=True),
+        menu_col.create_index("name", unique=True),
+    )
 
     # ─── ensure today’s kassa record ─────────
-    tz = pytz.timezone("Asia/Tashkent")
-    today = datetime.now(tz).strftime("%Y-%m-%d")
-    if not await kassa_col.find_one({"date": today}):
-        await kassa_col.insert_one({"date": today, "balance": 0, "transactions": []})
+    # $setOnInsert upserts: one atomic round-trip each instead of a
+    # find_one + insert_one pair that races with concurrent startups
+    # keep a local pytz lookup here: importing utils would be circular,
+    # and init_db runs once per process anyway
+    today = datetime.now(pytz.timezone("Asia/Tashkent")).strftime("%Y-%m-%d")
+    await kassa_col.update_one(
+        {"date": today},
+        {"$setOnInsert": {"date": today, "balance": 0, "transactions": []}},
+        upsert=True
+    )
 
     # ─── ensure default card details ──────────
-    if not await card_details_col.find_one({}):
-        await card_details_col.insert_one({
+    # empty filter: no-op when any card doc exists, seeds the default otherwise
+    await card_details_col.update_one(
+        {},
+        {"$setOnInsert": {
             "card_number": "4097840201138901",
             "card_owner":  "Abdukarimov Hasan",
-        })
+        }},
+        upsert=True
+    )
 
     # ─── ensure menus ─────────────────────────
-    for name, defaults in (("menu1", []), ("menu2", [])):
-        if not await menu_col.find_one({"name": name}):
-            await menu_col.insert_one({"name": name, "items": defaults})
+    await menu_col.bulk_write([
+        UpdateOne({"name": name}, {"$setOnInsert": {"items": []}}, upsert=True)
+        for name in ("menu1", "menu2")
+    ])
 
 
 async def get_collection(name: str):
     """
     Return the requested collection, initializing DB if needed.
-    Supports: users, kassa, daily_food_choices, card_details, menu, cancelled_lunches.
+    Supports: users, kassa, daily_food_choices, card_details, menu,
+    cancelled_lunches, blocked_users.
     """
     global _client
     if _client is None:
         await init_db()
 
-    if name == "users":
-        return users_col
-    if name == "kassa":
-        return kassa_col
-    if name == "daily_food_choices":
-        return daily_food_choices_col
-    if name == "card_details":
-        return card_details_col
-    if name == "menu":
-        return menu_col
-    if name == "cancelled_lunches":
-        return cancelled_lunches_col
-
-    raise ValueError(f"Unknown collection: {name}")
+    try:
+        return _collections[name]
+    except KeyError:
+        raise ValueError(f"Unknown collection: {name}") from None
 
 
 def run_init():
     """Sync helper to initialize DB before polling starts."""
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(init_db())
+    asyncio.run(init_db())
@@ -1,8 +1,9 @@
 # handlers/admin_handlers.py
 import re
+import asyncio
 import logging
-from datetime import datetime, timezone
-import pytz
+from datetime import date, datetime, timezone
+from functools import partial
 
 from telegram.constants import ParseMode
 from telegram.error import BadRequest
@@ -22,14 +23,30 @@ from telegram.ext import (
     filters,
 )
 
+from pymongo import ReadPreference, ReturnDocument, UpdateOne
+
 from database import get_collection
-from utils.sheets_utils import get_worksheet, sync_prices_from_sheet, sync_balances_incremental
+from utils.sheets_utils import (
+    clear_attendance_cell_in_sheet,
+    get_worksheet,
+    parse_sheet_number,
+    sync_prices_from_sheet,
+    sync_balances_incremental,
+)
 from utils import get_all_users_async, get_user_async, is_admin, get_default_kb
+from utils.validation_utils import invalidate_user_cache
+from utils.cache_utils import TTLCache
+from utils.broadcast_utils import send_personalized, send_to_many
+from utils.date_utils import TASHKENT_TZ
 from models.user_model import User
 from config import DEFAULT_DAILY_PRICE
 
 menu_col = None
 users_col = None
+card_col = None
+# read-only listings can run on a secondary when a replica set is deployed;
+# on a standalone mongod this behaves exactly like the primary handle
+users_read = None
 logger = logging.getLogger(__name__)
 
 # ─── STATES ────────────────────────────────────────────────────────────────────
@@ -59,31 +76,48 @@ DEL_MENU2_BTN  = "2‑Menudan O‘chirish"
 # ─── ADMIN PANEL KEYBOARD ──────────────────────────────────────────────────────
 async def init_collections():
     """Initialize the menu collection and ensure menu1/menu2 exist."""
-    global menu_col, users_col
+    global menu_col, users_col, users_read, card_col
     menu_col  = await get_collection("menu")
     users_col = await get_collection("users")
-    for name in ("menu1", "menu2"):
-        if not await menu_col.find_one({"name": name}):
-            await menu_col.insert_one({"name": name, "items": []})
+    card_col  = await get_collection("card_details")
+    users_read = users_col.with_options(
+        read_preference=ReadPreference.SECONDARY_PREFERRED
+    )
+    # one bulk round-trip of $setOnInsert upserts instead of a find_one +
+    # conditional insert_one pair per menu
+    await menu_col.bulk_write([
+        UpdateOne({"name": name}, {"$setOnInsert": {"items": []}}, upsert=True)
+        for name in ("menu1", "menu2")
+    ])
+
+# Both keyboards are static content; PTB only serializes them on send, so
+# build them once at import instead of reallocating on every admin reply.
+# Shared back-button rows/markups for the same reason.
+_BACK_ADMIN_ROW = [InlineKeyboardButton(BACK_BTN, callback_data="back_to_admin")]
+_BACK_MENU_ROW  = [InlineKeyboardButton(BACK_BTN, callback_data="menu_back")]
+_BACK_MENU_IKB  = InlineKeyboardMarkup([_BACK_MENU_ROW])
+_MENU_KB = InlineKeyboardMarkup([
+    [InlineKeyboardButton(VIEW_MENU1_BTN, callback_data="view_menu1"),
+     InlineKeyboardButton(VIEW_MENU2_BTN, callback_data="view_menu2")],
+    [InlineKeyboardButton(ADD_MENU1_BTN, callback_data="add_menu1"),
+     InlineKeyboardButton(ADD_MENU2_BTN, callback_data="add_menu2")],
+    [InlineKeyboardButton(DEL_MENU1_BTN, callback_data="del_menu1"),
+     InlineKeyboardButton(DEL_MENU2_BTN, callback_data="del_menu2")],
+    [InlineKeyboardButton(BACK_BTN, callback_data="back_to_admin")],
+])
+
+_ADMIN_KB = ReplyKeyboardMarkup([
+    [FOYD_BTN, MENU_BTN],
+    [ADD_ADMIN_BTN, REMOVE_ADMIN_BTN],
+    [DELETE_USER_BTN, KASSA_BTN],
+    [BACK_BTN],
+], resize_keyboard=True)
 
 def get_menu_kb():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(VIEW_MENU1_BTN, callback_data="view_menu1"),
-         InlineKeyboardButton(VIEW_MENU2_BTN, callback_data="view_menu2")],
-        [InlineKeyboardButton(ADD_MENU1_BTN, callback_data="add_menu1"),
-         InlineKeyboardButton(ADD_MENU2_BTN, callback_data="add_menu2")],
-        [InlineKeyboardButton(DEL_MENU1_BTN, callback_data="del_menu1"),
-         InlineKeyboardButton(DEL_MENU2_BTN, callback_data="del_menu2")],
-        [InlineKeyboardButton(BACK_BTN, callback_data="back_to_admin")],
-    ])
+    return _MENU_KB
 
 def get_admin_kb():
-    return ReplyKeyboardMarkup([
-        [FOYD_BTN, MENU_BTN],
-        [ADD_ADMIN_BTN, REMOVE_ADMIN_BTN],
-        [DELETE_USER_BTN, KASSA_BTN],
-        [BACK_BTN],
-    ], resize_keyboard=True)  
+    return _ADMIN_KB
 
 # ─── 1) /admin ENTRY & FIRST-TIME SETUP ────────────────────────────────────────
 async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -96,10 +130,30 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if users_col is None:
         users_col = await get_collection("users")
 
-    # First admin bootstrapping
-    admin_exists = await users_col.count_documents({"is_admin": True}, limit=1) > 0
+    # Fast path: an affirmative cached verdict answers both entry questions
+    # at once (an admin exists, and it is this user) with no round-trip.
+    if context.user_data.get("is_admin") or await is_admin(tg_id):
+        admin_exists, user = True, {"is_admin": True}
+    else:
+        # One $facet round-trip answers both entry questions: does any admin
+        # exist, and what is this user's record — instead of a count_documents
+        # plus a separate find_one.
+        facet = (await users_col.aggregate([
+            {"$facet": {
+                "admin": [{"$match": {"is_admin": True}}, {"$limit": 1},
+                          {"$project": {"_id": 1}}],
+                # only the flag is read below — don't ship the attendance
+                # and transactions arrays just to check one bit
+                "me":    [{"$match": {"telegram_id": tg_id}}, {"$limit": 1},
+                          {"$project": {"is_admin": 1, "_id": 0}}],
+            }}
+        ]).to_list(length=1))[0]
+        admin_exists = bool(facet["admin"])
+        user = facet["me"][0] if facet["me"] else None
     if not admin_exists:
-        await users_col.update_one(
+        # single upsert round-trip that also returns the doc for the panel
+        # check below — no separate update_one + find_one pair
+        user = await users_col.find_one_and_update(
             {"telegram_id": tg_id},
             {
                 "$setOnInsert": {
@@ -115,7 +169,9 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "$set": {"is_admin": True},
             },
             upsert=True,
+            return_document=ReturnDocument.AFTER,
         )
+        invalidate_user_cache(tg_id)
         # Acknowledge first‐admin creation
         if is_callback:
             await update.callback_query.answer()
@@ -129,12 +185,13 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text="✅ Siz birinchi admin bo‘ldingiz!"
         )
 
-    # Fetch and show panel
-    user = await users_col.find_one({"telegram_id": tg_id})
+    # Show panel — the user doc is already in hand from the facet/upsert
     if user and user.get("is_admin", False):
         text, kb = "🔧 Admin panelga xush kelibsiz:", get_admin_kb()
+        context.user_data["is_admin"] = True
     else:
         text, kb = "❌ Siz admin emassiz!", None
+        context.user_data["is_admin"] = False
 
     # If invoked by callback, answer + delete old message
     if is_callback:
@@ -157,12 +214,15 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ─── 2) BACK TO MAIN MENU ───────────────────────────────────────────────────────
 async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Return to the main menu with the correct reply keyboard."""
-    from utils import get_default_kb
-
     tg_id = update.effective_user.id
-    user = await users_col.find_one({"telegram_id": tg_id})
-    is_admin = bool(user and user.get("is_admin", False))
-    kb = get_default_kb(is_admin)
+    # don't shadow the imported is_admin(); the local name broke repeat calls.
+    # The flag is cached in user_data by admin_panel, so "Ortga" presses
+    # usually skip the lookup entirely.
+    admin_flag = context.user_data.get("is_admin")
+    if admin_flag is None:
+        admin_flag = await is_admin(tg_id)
+        context.user_data["is_admin"] = admin_flag
+    kb = get_default_kb(admin_flag)
     text = "Bosh menyu:"
 
     if update.callback_query:
@@ -185,18 +245,19 @@ async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── 3) LIST USERS ──────────────────────────────────────────────────────────────
 
+# bound-method template: one format call per user, no intermediate list —
+# join over the generator lets CPython size the final buffer once
+_USER_LINE = (
+    "• *{name}* (ID: {tg})\n"
+    "   💰 Balans: *{bal:,}* so‘m | 📝 Narx: *{price:,}* so‘m"
+).format
+
 def format_users_list(users: list[User]) -> str:
-    if not users:
-        return "Hech qanday foydalanuvchi yo‘q."
-    lines = [
-        f"• *{u.name}* (ID: {u.telegram_id})\n"
-        f"   💰 Balans: *{u.balance:,}* so‘m | 📝 Narx: *{u.daily_price:,}* so‘m"
+    return "\n\n".join(
+        _USER_LINE(name=u.name, tg=u.telegram_id, bal=u.balance, price=u.daily_price)
         for u in users
-    ]
-    return "\n\n".join(lines)
+    ) or "Hech qanday foydalanuvchi yo‘q."
 
-from telegram.constants import ParseMode
-from utils.sheets_utils import sync_balances_incremental
 
 async def list_users_exec(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show user list, syncing prices then balances from Sheets first."""
@@ -207,9 +268,10 @@ async def list_users_exec(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # optional: you can tell admin how many changed:
         # await update.message.reply_text(f"✅ {price_sync['updated']} ta narx yangilandi.")
         
-        # 2) Fetch all users (name, telegram_id, balance, daily_price)
-        cursor = users_col.find(
-            {}, 
+        # 2) Fetch all users (name, telegram_id, balance, daily_price) —
+        # display-only read, so a secondary may serve it
+        cursor = (users_read or users_col).find(
+            {},
             {"telegram_id": 1, "name": 1, "balance": 1, "daily_price": 1}
         )
         mongo_users = await cursor.to_list(length=None)
@@ -232,7 +294,11 @@ async def list_users_exec(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # 5) Build and send the list safely
         if mongo_users:
+            # totals fall out of the per-user pass for free — the documents
+            # are already in memory and carry the just-synced balances, so
+            # another server round-trip would only risk disagreeing
             lines = []
+            total_balance = 0.0
             for u in mongo_users:
                 bal = u.get("balance", 0) or 0
                 price = u.get("daily_price", 0) or 0
@@ -245,11 +311,16 @@ async def list_users_exec(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     price = float(price)
                 except:
                     price = 0
+                total_balance += bal
                 lines.append(
                     f"• *{u['name']}* (ID: {u['telegram_id']})\n"
                     f"   💰 Balans: *{bal:,.0f}* so‘m | 📝 Narx: *{price:,.0f}* so‘m"
                 )
             text = "\n\n".join(lines)
+            text += (
+                f"\n\n👥 Jami: *{len(mongo_users)}* ta foydalanuvchi | "
+                f"💰 Umumiy balans: *{total_balance:,.0f}* so‘m"
+            )
         else:
             text = "Hech qanday foydalanuvchi yo‘q."
 
@@ -267,24 +338,76 @@ async def list_users_exec(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 # ─── 4) ADMIN PROMOTION / DEMOTION ─────────────────────────────────────────────
 
-async def start_add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    # get the message container (either query.message or update.message)
-    msg = update.callback_query.message if update.callback_query else update.message
+# selection keyboards only show the name, so only move name + id over the wire
+_PICK_USER_PROJ = {"telegram_id": 1, "name": 1, "_id": 0}
 
-    users = await users_col.find({"is_admin": False}).to_list(length=None)
-    if not users:
-        return await msg.reply_text("Barcha foydalanuvchilar allaqachon admin!", reply_markup=get_admin_kb())
+# one page per message keeps the keyboard well under Telegram's 100-button
+# limit and the serialized markup small even with thousands of users
+PICK_PAGE_SIZE = 30
 
-    keyboard = [
-        [InlineKeyboardButton(u["name"], callback_data=f"add_admin:{u['telegram_id']}")]
-        for u in users
-    ]
-    keyboard.append([InlineKeyboardButton("Ortga", callback_data="back_to_admin")])
+async def _send_user_page(update, context, *, flt, action, prompt, empty_text,
+                          page: int = 0, edit: bool = False):
+    """Render one page of the user-selection keyboard for `action`."""
+    msg = update.callback_query.message if update.callback_query else update.message
 
-    await msg.reply_text(
-        "Admin qilmoqchi bo'lgan foydalanuvchini tanlang:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+    # stream name+id rows off the cursor; limit(size+1) detects whether a
+    # next page exists without a separate count round-trip
+    keyboard = []
+    cursor = (
+        (users_read or users_col).find(flt, _PICK_USER_PROJ)
+        .skip(page * PICK_PAGE_SIZE)
+        .limit(PICK_PAGE_SIZE + 1)
     )
+    async for u in cursor:
+        keyboard.append(
+            [InlineKeyboardButton(u["name"], callback_data=f"{action}:{u['telegram_id']}")]
+        )
+    if not keyboard and page == 0:
+        return await msg.reply_text(empty_text, reply_markup=get_admin_kb())
+
+    has_next = len(keyboard) > PICK_PAGE_SIZE
+    if has_next:
+        keyboard = keyboard[:PICK_PAGE_SIZE]
+
+    nav = []
+    if page:
+        nav.append(InlineKeyboardButton("⬅️ Oldingi", callback_data=f"{action}:pg:{page - 1}"))
+    if has_next:
+        nav.append(InlineKeyboardButton("Keyingi ➡️", callback_data=f"{action}:pg:{page + 1}"))
+    if nav:
+        keyboard.append(nav)
+    keyboard.append(_BACK_ADMIN_ROW)
+
+    markup = InlineKeyboardMarkup(keyboard)
+    if edit:
+        await msg.edit_text(prompt, reply_markup=markup)
+    else:
+        await msg.reply_text(prompt, reply_markup=markup)
+
+# per-action page parameters, shared by the start handlers and pg: navigation
+_PICK_SPECS = {
+    "add_admin": dict(
+        flt={"is_admin": False},
+        action="add_admin",
+        prompt="Admin qilmoqchi bo'lgan foydalanuvchini tanlang:",
+        empty_text="Barcha foydalanuvchilar allaqachon admin!",
+    ),
+    "remove_admin": dict(
+        flt={"is_admin": True},
+        action="remove_admin",
+        prompt="Adminlikdan olib tashlamoqchi bo'lgan foydalanuvchini tanlang:",
+        empty_text="Adminlar mavjud emas!",
+    ),
+    "delete_user": dict(
+        flt={},
+        action="delete_user",
+        prompt="O‘chirmoqchi bo‘lgan foydalanuvchini tanlang:",
+        empty_text="Hech qanday foydalanuvchi yo‘q.",
+    ),
+}
+
+async def start_add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _send_user_page(update, context, **_PICK_SPECS["add_admin"])
 
 # ─── Promote to admin ──────────────────────────────────────────────────────────
 async def add_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -299,38 +422,27 @@ async def add_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     # data is "add_admin:<id>"
     user_id = int(query.data.split(":", 1)[1])
-    await users_col.update_one({"telegram_id": user_id}, {"$set": {"is_admin": True}})
-    user = await users_col.find_one({"telegram_id": user_id})
-
-    # update inline menu to confirm
-    await query.message.edit_text(f"✅ {user['name']} admin qilindi!")
+    # one round-trip: update and fetch the name for the confirmation together
+    user = await users_col.find_one_and_update(
+        {"telegram_id": user_id},
+        {"$set": {"is_admin": True}},
+        projection={"name": 1, "_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    invalidate_user_cache(user_id)
+    # drop the target user's cached menu flag too
+    context.application.user_data[user_id].pop("is_admin", None)
+
+    # update inline menu to confirm — the target can vanish between keyboard
+    # render and click, in which case find_one_and_update returns None
+    name = user["name"] if user else "?"
+    await query.message.edit_text(f"✅ {name} admin qilindi!")
     # re‑display the promotion list
     await start_add_admin(update, context)
 
 async def start_remove_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show list of admin users to demote, with a working back button."""
-    # Determine where to send replies
-    msg = update.callback_query.message if update.callback_query else update.message
-
-    # Fetch current admins
-    admins = await users_col.find({"is_admin": True}).to_list(length=None)
-    if not admins:
-        return await msg.reply_text(
-            "Adminlar mavjud emas!",
-            reply_markup=get_admin_kb()
-        )
-
-    # Build inline keyboard
-    keyboard = [
-        [InlineKeyboardButton(a["name"], callback_data=f"remove_admin:{a['telegram_id']}")]
-        for a in admins
-    ]
-    keyboard.append([InlineKeyboardButton("Ortga", callback_data="back_to_admin")])
-
-    await msg.reply_text(
-        "Adminlikdan olib tashlamoqchi bo'lgan foydalanuvchini tanlang:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
-    )
+    await _send_user_page(update, context, **_PICK_SPECS["remove_admin"])
 
 
 # ─── Demote from admin ─────────────────────────────────────────────────────────
@@ -344,35 +456,30 @@ async def remove_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         return
 
     user_id = int(query.data.split(":", 1)[1])
-    await users_col.update_one({"telegram_id": user_id}, {"$set": {"is_admin": False}})
-    user = await users_col.find_one({"telegram_id": user_id})
+    # one round-trip: demote and fetch the name for the confirmation together
+    doc = await users_col.find_one_and_update(
+        {"telegram_id": user_id},
+        {"$set": {"is_admin": False}},
+        projection={"name": 1, "_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    invalidate_user_cache(user_id)
+    # drop the target user's cached menu flag too
+    context.application.user_data[user_id].pop("is_admin", None)
+    name = doc["name"] if doc else "?"
 
-    await query.message.edit_text(f"✅ {user['name']} adminlikdan olib tashlandi!")
+    await query.message.edit_text(f"✅ {name} adminlikdan olib tashlandi!")
     await start_remove_admin(update, context)
 
 # ─── 6) DELETE USER ─────────────────────────────────────────────────────────────
 
 async def start_delete_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show list of users for deletion."""
-    # pick the right message object
-    msg = update.callback_query.message if update.callback_query else update.message
-
-    users = await users_col.find().to_list(length=None)
-    if not users:
-        return await msg.reply_text("Hech qanday foydalanuvchi yo‘q.", reply_markup=get_admin_kb())
-
-    keyboard = [
-        [InlineKeyboardButton(u["name"], callback_data=f"delete_user:{u['telegram_id']}")]
-        for u in users
-    ]
-    # use the same back callback as your other panels
-    keyboard.append([InlineKeyboardButton(BACK_BTN, callback_data="back_to_admin")])
-
-    text = "O‘chirmoqchi bo‘lgan foydalanuvchini tanlang:"
-    if update.callback_query:
-        await msg.edit_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
-    else:
-        await msg.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    await _send_user_page(
+        update, context,
+        edit=bool(update.callback_query),
+        **_PICK_SPECS["delete_user"],
+    )
 
 
 # ─── Delete a user ─────────────────────────────────────────────────────────────
@@ -387,25 +494,69 @@ async def delete_user_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         return
 
     user_id = int(query.data.split(":", 1)[1])
-    user = await users_col.find_one({"telegram_id": user_id})
-    if not user:
+    # one round-trip: delete the user and get the name for the confirmation
+    choices_col = await get_collection("daily_food_choices")
+    doc, _ = await asyncio.gather(
+        users_col.find_one_and_delete(
+            {"telegram_id": user_id}, projection={"name": 1, "_id": 0}
+        ),
+        choices_col.delete_many({"telegram_id": user_id}),
+    )
+    invalidate_user_cache(user_id)
+    if not doc:
         await query.message.edit_text("❌ Foydalanuvchi topilmadi.", reply_markup=get_menu_kb())
         return
-
-    # clean up
-    await (await get_collection("daily_food_choices")).delete_many({"telegram_id": user_id})
-    await users_col.delete_one({"telegram_id": user_id})
+    name = doc["name"]
 
     # confirm and then show panel
     await query.message.delete()
     await query.message.reply_text(
-        f"✅ {user['name']} muvaffaqiyatli o‘chirildi!\n🔧 Admin panelga qaytdingiz.",
+        f"✅ {name} muvaffaqiyatli o‘chirildi!\n🔧 Admin panelga qaytdingiz.",
         reply_markup=get_admin_kb()
     )
 
+# ─── USER MGMT CALLBACK DISPATCH ───────────────────────────────────────────────
+# One compiled pattern + dict lookup instead of three CallbackQueryHandlers
+# each re-matching its own pattern against every callback update.
+USER_MGMT_RE = re.compile(r"^(add_admin|remove_admin|delete_user):(pg:)?\d+$")
+
+async def user_mgmt_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    action, rest = update.callback_query.data.split(":", 1)
+    if rest.startswith("pg:"):
+        # page navigation: edit the current message in place
+        await update.callback_query.answer()
+        await _send_user_page(
+            update, context,
+            page=int(rest[3:]),
+            edit=True,
+            **_PICK_SPECS[action],
+        )
+        return
+    await _USER_MGMT_DISPATCH[action](update, context)
+
+_USER_MGMT_DISPATCH = {
+    "add_admin":    add_admin_callback,
+    "remove_admin": remove_admin_callback,
+    "delete_user":  delete_user_callback,
+}
+
+
+# Admins often check the kassa back-to-back; a short TTL turns the repeat
+# lookups into a dict hit instead of a Sheets round-trip + Mongo write.
+_kassa_cache = TTLCache(maxsize=1, ttl=60.0)
+
 async def show_kassa(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show current kassa amount from Google Sheets and save to DB."""
     try:
+        cached = _kassa_cache.get("kassa")
+        if cached is not None:
+            await update.message.reply_text(
+                f"💰 *Kassa miqdori:* {cached:,.0f} so‘m",
+                parse_mode='Markdown',
+                reply_markup=get_admin_kb()
+            )
+            return
+
         await update.message.reply_text("⌛️ Kassa tekshirilmoqda…")
         # 1) Fetch the worksheet
         worksheet = await get_worksheet()
@@ -419,10 +570,9 @@ async def show_kassa(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Kassa miqdori topilmadi.")
             return
 
-        # 3) Parse as float
-        try:
-            kassa_value = float(str(raw).replace(',', '').strip())
-        except ValueError:
+        # 3) Parse as float (pre-validated, no exception path on bad cells)
+        kassa_value = parse_sheet_number(raw)
+        if kassa_value is None:
             await update.message.reply_text("❌ Kassa miqdorini o'qishda xatolik.")
             return
 
@@ -436,6 +586,7 @@ async def show_kassa(update: Update, context: ContextTypes.DEFAULT_TYPE):
             }},
             upsert=True
         )
+        _kassa_cache.set("kassa", kassa_value)
 
         # 5) Send result back to admin with the admin keyboard
         text = f"💰 *Kassa miqdori:* {kassa_value:,.0f} so‘m"
@@ -452,6 +603,10 @@ async def show_kassa(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_admin_kb()
         )
 
+# rendered once; per click we only concatenate instead of rebuilding an
+# f-string around the message body
+_NOTIFY_ACK_SUFFIX = "\n\n✅ Javobingiz qabul qilindi."
+
 async def notify_response_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle user responses to notifications"""
     query = update.callback_query
@@ -460,31 +615,23 @@ async def notify_response_callback(update: Update, context: ContextTypes.DEFAULT
     # Parse the callback data
     _, response, user_id = query.data.split(':')
     user_id = int(user_id)
-    
-    # Get the user who responded
-    user = await get_user_async(user_id)
-    if not user:
-        return
-    
-    # Get the notification responses from context
-    if 'notify_responses' not in context.user_data:
+
+    # Get the notification responses from context (single dict lookup)
+    responses = context.user_data.get('notify_responses')
+    if responses is None:
         return
-    
-    responses = context.user_data['notify_responses']
-    user_info = f"{user.name} ({user.telegram_id})"
-    
-    # Update the response tracking
-    if response == 'yes':
-        if user_info not in responses['yes']:
-            responses['yes'].append(user_info)
-    else:  # response == 'no'
-        if user_info not in responses['no']:
-            responses['no'].append(user_info)
+
+    # store raw ids: no user fetch and no label f-string per click — the
+    # summary only ever counts the buckets
+    responses.setdefault('yes', set())
+    responses.setdefault('no', set())
+    if not isinstance(responses['yes'], set):
+        responses['yes'] = set(responses['yes'])
+        responses['no'] = set(responses['no'])
+    responses['yes' if response == 'yes' else 'no'].add(user_id)
     
     # Edit the message to remove the buttons
-    await query.message.edit_text(
-        f"{query.message.text}\n\n✅ Javobingiz qabul qilindi."
-    )
+    await query.message.edit_text(query.message.text + _NOTIFY_ACK_SUFFIX)
 
 # ─── MENU MANAGEMENT ───────────────────────────────────────────────────────
 async def menu_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -522,7 +669,7 @@ async def add_menu_prompt(update: Update, context: ContextTypes.DEFAULT_TYPE, me
     context.user_data["pending_menu_add"] = menu_name
     await query.message.edit_text(
         f"Yangi taom nomini kiriting ({menu_name}):",
-        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(BACK_BTN, callback_data="menu_back")]])
+        reply_markup=_BACK_MENU_IKB
     )
 
 async def handle_menu_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -546,7 +693,7 @@ async def del_menu_prompt(update: Update, context: ContextTypes.DEFAULT_TYPE, me
     doc = await menu_col.find_one({"name": menu_name})
     items = doc.get("items", [])
     kb = [[InlineKeyboardButton(i, callback_data=f"del_{menu_name}:{i}")] for i in items]
-    kb.append([InlineKeyboardButton(BACK_BTN, callback_data="menu_back")])
+    kb.append(_BACK_MENU_ROW)
     await query.message.edit_text(f"{menu_name} dan o‘chirish:", reply_markup=InlineKeyboardMarkup(kb))
 
 async def handle_menu_del(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -559,6 +706,26 @@ async def handle_menu_del(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await menu_col.update_one({"name": menu_name}, {"$pull": {"items": food}})
     await query.message.edit_text(f"✅ «{food}» {menu_name} dan o‘chirildi.", reply_markup=get_menu_kb())
 
+async def _menu_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Go back to admin panel / remove the menu message."""
+    query = update.callback_query
+    try:
+        await query.message.delete()
+    except BadRequest:
+        await query.message.reply_text("🔧 Admin panelga qaytdingiz.", reply_markup=get_admin_kb())
+
+# Exact-match menu callbacks resolve in one dict lookup instead of walking
+# an if/elif chain; only the del_menuN:<item> form needs a prefix check.
+_MENU_CB_DISPATCH = {
+    "view_menu1": partial(view_menu, menu_name="menu1"),
+    "view_menu2": partial(view_menu, menu_name="menu2"),
+    "add_menu1":  partial(add_menu_prompt, menu_name="menu1"),
+    "add_menu2":  partial(add_menu_prompt, menu_name="menu2"),
+    "del_menu1":  partial(del_menu_prompt, menu_name="menu1"),
+    "del_menu2":  partial(del_menu_prompt, menu_name="menu2"),
+    "menu_back":  _menu_back,
+}
+
 async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Dispatch menu panel callbacks to the correct helper."""
     if menu_col is None:
@@ -567,39 +734,22 @@ async def menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     data = query.data
 
-    if data == "view_menu1":
-        await view_menu(update, context, "menu1")
-    elif data == "view_menu2":
-        await view_menu(update, context, "menu2")
-    elif data == "add_menu1":
-        await add_menu_prompt(update, context, "menu1")
-    elif data == "add_menu2":
-        await add_menu_prompt(update, context, "menu2")
-    elif data == "del_menu1":
-        await del_menu_prompt(update, context, "menu1")
-    elif data == "del_menu2":
-        await del_menu_prompt(update, context, "menu2")
-    elif data == "menu_back":
-        # go back to admin panel or remove menu message
-        try:
-            await query.message.delete()
-        except BadRequest:
-            await update.callback_query.message.reply_text("🔧 Admin panelga qaytdingiz.", reply_markup=get_admin_kb())
+    handler = _MENU_CB_DISPATCH.get(data)
+    if handler is not None:
+        await handler(update, context)
+    elif data.startswith(("del_menu1:", "del_menu2:")):
+        await handle_menu_del(update, context)
     else:
-        # catch delete callbacks
-        if data.startswith("del_menu1:") or data.startswith("del_menu2:"):
-            await handle_menu_del(update, context)
-        else:
-            await query.message.edit_text("❌ Noma’lum buyruq.", reply_markup=get_menu_kb())
+        await query.message.edit_text("❌ Noma’lum buyruq.", reply_markup=get_menu_kb())
 
 async def send_final_summary(context: ContextTypes.DEFAULT_TYPE):
     """Send final summary of broadcast at 10:00 AM."""
     job = context.job
     chat_id = job.data.get("chat_id")
-    if not chat_id or "notify_responses" not in context.user_data:
+    ud = context.user_data
+    resp = ud.get("notify_responses")
+    if not chat_id or resp is None:
         return
-
-    resp = context.user_data["notify_responses"]
     total   = resp.get("total_sent", 0)
     yes     = len(resp.get("yes", []))
     no      = len(resp.get("no", []))
@@ -618,8 +768,8 @@ async def send_final_summary(context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id, "\n".join(lines))
 
     # clean up
-    context.user_data.pop("notify_responses", None)
-    context.user_data.pop("notify_message_id", None)
+    ud.pop("notify_responses", None)
+    ud.pop("notify_message_id", None)
 
 
 # ─── 9b) Daily lunch summary & deduction ────────────────────────────────────
@@ -628,7 +778,7 @@ async def send_summary(context: ContextTypes.DEFAULT_TYPE):
     Send daily attendance summary to all admins and users, then deduct balances.
     Scheduled at 10:00 Asia/Tashkent.
     """
-    tz    = pytz.timezone("Asia/Tashkent")
+    tz    = TASHKENT_TZ
     now   = datetime.now(tz)
     today = now.strftime("%Y-%m-%d")
     
@@ -644,12 +794,21 @@ async def send_summary(context: ContextTypes.DEFAULT_TYPE):
     users = await get_all_users_async()
     attendees, attendee_details, declined, pending = [], [], [], []
 
+    # today's food choices in one query instead of a find_one per attendee
+    choices_col = await get_collection("daily_food_choices")
+    food_map = {
+        d["telegram_id"]: d.get("food_choice")
+        async for d in choices_col.find(
+            {"date": today},
+            {"telegram_id": 1, "food_choice": 1, "_id": 0},
+        )
+    }
+
     # categorize
     for u in users:
         if today in u.attendance:
             attendees.append(u)
-            choice = await u.get_food_choice(today)
-            attendee_details.append((u.name, choice))
+            attendee_details.append((u.name, food_map.get(u.telegram_id)))
         elif today in u.declined_days:
             declined.append(u.name)
         else:
@@ -704,43 +863,48 @@ async def send_summary(context: ContextTypes.DEFAULT_TYPE):
 
     from utils.sheets_utils import get_balance_from_sheet  # make sure you have this function
 
+    # the food line is identical for every attendee, so assemble the recap
+    # template once and only fill the balance inside the loop
+    if most:
+        label = "taomlar" if len(most) > 1 else "taom"
+        food_line = f"🥇 Bugun tanlangan {label}: 🍛 {' va '.join(most)}\n"
+    else:
+        food_line = "🥄 Bugun asosiy taom aniqlanmadi.\n"
+    recap = (
+        "✅🍽️ Siz bugungi tushlik ro‘yxatidasiz.\n\n"
+        + food_line +
+        "💰 Balansingiz: {balance:,.0f} so‘m\n\n"
+        "ℹ️ Agar tanlangan taom sizga to'g'ri kelmasa, "
+        "soat 10:00 gacha /bekor_qilish buyrug'i orqali ro'yxatdan chiqishingiz mumkin."
+    ).format
+
     for u in attendees:
         try:
             # ✅ fetch latest balance from Google Sheets
             balance = await get_balance_from_sheet(u.telegram_id)
-
-            if most:
-                if len(most) > 1:
-                    foods = " va ".join(most)
-                    text = (
-                        "✅🍽️ Siz bugungi tushlik ro‘yxatidasiz.\n\n"
-                        f"🥇 Bugun tanlangan taomlar: 🍛 {foods}\n"
-                        f"💰 Balansingiz: {balance:,.0f} so‘m\n\n"
-                        "ℹ️ Agar tanlangan taom sizga to'g'ri kelmasa, "
-                        "soat 10:00 gacha /bekor_qilish buyrug'i orqali ro'yxatdan chiqishingiz mumkin."
-                    )
-                else:
-                    text = (
-                        "✅🍽️ Siz bugungi tushlik ro‘yxatidasiz.\n\n"
-                        f"🥇 Bugun tanlangan taom: 🍛 {most[0]}\n"
-                        f"💰 Balansingiz: {balance:,.0f} so‘m\n\n"
-                        "ℹ️ Agar tanlangan taom sizga to'g'ri kelmasa, "
-                        "soat 10:00 gacha /bekor_qilish buyrug'i orqali ro'yxatdan chiqishingiz mumkin."
-                    )
-            else:
-                text = (
-                    "✅🍽️ Siz bugungi tushlik ro‘yxatidasiz.\n\n"
-                    "🥄 Bugun asosiy taom aniqlanmadi.\n"
-                    f"💰 Balansingiz: {balance:,.0f} so‘m\n\n"
-                    "ℹ️ Agar tanlangan taom sizga to'g'ri kelmasa, "
-                    "soat 10:00 gacha /bekor_qilish buyrug'i orqali ro'yxatdan chiqishingiz mumkin."
-                )
-
-            await context.bot.send_message(u.telegram_id, text, reply_markup=get_default_kb(u.is_admin))
+            await context.bot.send_message(
+                u.telegram_id,
+                recap(balance=balance),
+                reply_markup=get_default_kb(u.is_admin)
+            )
         except Exception as e:
             logger.error(f"Failed user recap for {u.telegram_id}: {e}")
 # ─── CARD MANAGEMENT ─────────────────────────────────────────────────────────
 
+# The single card-details document is read on every "💳 Karta Raqami"
+# press but only written through the two commands below, so cache it and
+# drop the copy on write.
+_card_doc = None
+
+async def get_card_details() -> dict | None:
+    """Return the (cached) card-details document."""
+    global _card_doc
+    if _card_doc is None:
+        col = card_col or await get_collection("card_details")
+        _card_doc = await col.find_one({})
+    return _card_doc
+
+
 # ─── /karta_raqami — set card number ────────────────────────────────────────────
 async def set_card_number_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await is_admin(update.effective_user.id):
@@ -748,8 +912,10 @@ async def set_card_number_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not context.args:
         return await update.message.reply_text("❌ Foydalanish: /karta_raqami <raqam>")
     number = context.args[0]
-    col = await get_collection("card_details")
+    col = card_col or await get_collection("card_details")
     await col.update_one({}, {"$set": {"card_number": number}}, upsert=True)
+    global _card_doc
+    _card_doc = None
     await update.message.reply_text(
         f"✅ Karta raqami o‘zgartirildi: `{number}`",
         parse_mode=ParseMode.MARKDOWN,
@@ -763,8 +929,10 @@ async def set_card_owner_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not context.args:
         return await update.message.reply_text("❌ Foydalanish: /karta_egasi <ism>")
     owner = " ".join(context.args)
-    col = await get_collection("card_details")
+    col = card_col or await get_collection("card_details")
     await col.update_one({}, {"$set": {"card_owner": owner}}, upsert=True)
+    global _card_doc
+    _card_doc = None
     await update.message.reply_text(
         f"✅ Karta egasi o‘zgartirildi: *{owner}*",
         parse_mode=ParseMode.MARKDOWN,
@@ -805,6 +973,26 @@ async def run_summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     await send_summary(context)
     return ConversationHandler.END
 
+async def backup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin only: dump every collection to JSON files on disk."""
+    if not await is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ Siz admin emassiz.")
+
+    from utils.backup_utils import create_backup
+
+    await update.message.reply_text("⏳ Zaxira nusxa olinmoqda…")
+    try:
+        result = await create_backup()
+    except Exception as e:
+        logger.error(f"Backup failed: {e}", exc_info=True)
+        return await update.message.reply_text("❌ Zaxira nusxa olishda xatolik.")
+
+    lines = [f"• {name}: {count} ta hujjat" for name, count in result["counts"].items()]
+    await update.message.reply_text(
+        "✅ Zaxira nusxa tayyor:\n" + "\n".join(lines)
+    )
+
+
 async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Only admins can invoke this
     if not await is_admin(update.effective_user.id):
@@ -817,17 +1005,27 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     text = " ".join(context.args)
-    sent = failed = 0
 
-    users = await get_all_users_async()
-    for u in users:
-        try:
-            await context.bot.send_message(u.telegram_id, text)
-            sent += 1
-        except Exception:
-            failed += 1
+    # ack now, fan out in the background — a big broadcast takes tens of
+    # seconds at the rate limit and shouldn't hold the handler hostage
+    await update.message.reply_text("✅ Navbatga qo‘shildi, yuborilmoqda…")
+    context.application.create_task(
+        _run_broadcast(context, text, update.effective_chat.id)
+    )
 
-    await update.message.reply_text(
+
+async def _run_broadcast(context, text: str, admin_chat_id: int):
+    """Background half of broadcast_command: fan out, then report back."""
+    # id-only projection — no full User objects in memory
+    users_col = await get_collection("users")
+    chat_ids = [
+        doc["telegram_id"]
+        async for doc in users_col.find({}, {"telegram_id": 1, "_id": 0})
+    ]
+    sent, failed = await send_to_many(context.bot, chat_ids, text)
+
+    await context.bot.send_message(
+        admin_chat_id,
         f"✅ Jami {sent} ta foydalanuvchiga yuborildi\n"
         f"⚠️ {failed} ta xatolik yuz berdi."
     )
@@ -849,13 +1047,18 @@ async def cancel_lunch_command(update: Update, context: ContextTypes.DEFAULT_TYP
     reason = " ".join(reason_parts).strip() or "Sabab ko‘rsatilmagan"
 
     # Normalize date_str
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     today = datetime.now(tz).date()
     if raw_date.lower() in ("bugun", "today"):
         date_str = today.strftime("%Y-%m-%d")
     else:
         try:
-            dt = datetime.strptime(raw_date, "%Y-%m-%d").date()
+            # C-accelerated YYYY-MM-DD parse — strptime re-interprets the
+            # format string on every call. The length check rejects the
+            # compact ISO forms fromisoformat also accepts on 3.11+.
+            if len(raw_date) != 10:
+                raise ValueError(raw_date)
+            dt = date.fromisoformat(raw_date)
         except ValueError:
             return await update.message.reply_text(
                 "❌ Sana noto‘g‘ri formatda. Iltimos: YYYY-MM-DD yoki “bugun”.",
@@ -883,34 +1086,95 @@ async def cancel_lunch_command(update: Update, context: ContextTypes.DEFAULT_TYP
         upsert=True
     )
 
-    # 2) Notify everyone and refund if they’d already checked in
-    users = await get_all_users_async()
-    refunded = 0
-    for u in users:
-        # if they already had attendance, remove & refund
-        if date_str in u.attendance:
-            await u.remove_attendance(date_str)
-            refunded += 1
-
-        text = (
-            f"⚠️ {date_str} kuni tushlik bekor qilindi.\n\n"
-            f"Sabab: {reason}"
-        )
-        # note: after remove_attendance, u.daily_price is still the same
-        if date_str not in u.attendance:
-            text += f"\n💰 Balansingizga {u.daily_price:,.0f} so‘m qaytarildi."
+    # 2) Acknowledge immediately and run the heavy refund + fan-out work in
+    # a background task, so the admin (and every other update) isn't stuck
+    # behind seconds of rate-limited sends.
+    await update.message.reply_text(
+        f"⏳ {date_str} uchun bekor qilish boshlandi…",
+        reply_markup=get_default_kb(True)
+    )
+    context.application.create_task(
+        _run_cancellation(context, date_str, reason, update.effective_chat.id)
+    )
 
-        try:
-            await context.bot.send_message(
-                chat_id=u.telegram_id,
-                text=text,
-                reply_markup=get_default_kb(u.is_admin)
+
+async def _run_cancellation(context, date_str: str, reason: str, admin_chat_id: int):
+    """Background half of cancel_lunch_command: refund, notify, report back."""
+    # Let Mongo pick the attendees via the attendance index instead of
+    # loading every full user document and scanning the arrays in Python.
+    attendees = await users_col.find(
+        {"attendance": date_str},
+        {"telegram_id": 1, "daily_price": 1, "_id": 0},
+    ).to_list(length=None)
+    refunded = len(attendees)
+    # O(1) membership when deciding who gets the refund line below
+    affected_ids = {a["telegram_id"] for a in attendees}
+
+    if attendees:
+        # one bulk_write covers every refund instead of a full-document
+        # save (plus a per-user sheet scan for the live price) per attendee
+        now_iso = datetime.now(timezone.utc).isoformat()
+        ops = [
+            UpdateOne(
+                # matching on attendance too makes the refund idempotent:
+                # a re-run of the same cancellation matches zero documents
+                {"telegram_id": a["telegram_id"], "attendance": date_str},
+                {
+                    "$pull": {"attendance": date_str},
+                    "$push": {"transactions": {
+                        "type": "cancel",
+                        "amount": a.get("daily_price", 0),
+                        "desc": f"Cancel lunch on {date_str}",
+                        "date": now_iso,
+                    }},
+                },
             )
-        except Exception as e:
-            logger.warning(f"Unable to notify {u.telegram_id}: {e}")
+            for a in attendees
+        ]
+        choices_col = await get_collection("daily_food_choices")
+        await asyncio.gather(
+            users_col.bulk_write(ops, ordered=False),
+            choices_col.delete_many({
+                "date": date_str,
+                "telegram_id": {"$in": [a["telegram_id"] for a in attendees]},
+            }),
+        )
+        for a in attendees:
+            invalidate_user_cache(a["telegram_id"])
+
+        # sheet cell clears are independent HTTP calls — run them together
+        results = await asyncio.gather(
+            *(clear_attendance_cell_in_sheet(a["telegram_id"]) for a in attendees),
+            return_exceptions=True,
+        )
+        for a, res in zip(attendees, results):
+            if isinstance(res, Exception):
+                logger.error(f"Failed clearing sheet cell for {a['telegram_id']}: {res}")
+
+    base_text = (
+        f"⚠️ {date_str} kuni tushlik bekor qilindi.\n\n"
+        f"Sabab: {reason}"
+    )
+    payloads = []
+    # everyone gets notified, but only the display fields cross the wire
+    notify_proj = {"telegram_id": 1, "is_admin": 1, "daily_price": 1, "_id": 0}
+    async for doc in users_col.find({}, notify_proj):
+        text = base_text
+        if doc["telegram_id"] in affected_ids:
+            text += f"\n💰 Balansingizga {doc.get('daily_price', 0):,.0f} so‘m qaytarildi."
+        payloads.append((
+            doc["telegram_id"],
+            text,
+            {"reply_markup": get_default_kb(bool(doc.get("is_admin")))},
+        ))
+
+    # fan out under the shared rate-limit semaphore instead of one awaited
+    # send per user
+    await send_personalized(context.bot, payloads)
 
     # 3) Confirm back to the admin
-    await update.message.reply_text(
+    await context.bot.send_message(
+        admin_chat_id,
         f"✅ {date_str} uchun tushlik bekor qilindi.\n"
         f"Refund: {refunded} foydalanuvchi.",
         reply_markup=get_default_kb(True)
@@ -953,9 +1217,29 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
 
+async def _init_collections_job(context: ContextTypes.DEFAULT_TYPE):
+    """Startup job: warm the module-level collection handles."""
+    await init_collections()
+
+
+# ─── ADMIN BUTTON DISPATCH ─────────────────────────────────────────────────────
+_ADMIN_BTN_DISPATCH = {
+    FOYD_BTN:         list_users_exec,
+    ADD_ADMIN_BTN:    start_add_admin,
+    REMOVE_ADMIN_BTN: start_remove_admin,
+    DELETE_USER_BTN:  start_delete_user,
+    KASSA_BTN:        show_kassa,
+    MENU_BTN:         menu_panel,
+    BACK_BTN:         back_to_menu,  # Ortga always goes to menu
+}
+
+async def admin_button_dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _ADMIN_BTN_DISPATCH[update.message.text](update, context)
+
+
 def register_handlers(app):
     # ─── INITIALIZATION ────────────────────────────────────────────────
-    app.job_queue.run_once(lambda _: init_collections(), when=0)
+    app.job_queue.run_once(_init_collections_job, when=0)
 
     # ─── 1) CORE COMMANDS ──────────────────────────────────────────────
     app.add_handler(CommandHandler("admin", admin_panel))
@@ -964,31 +1248,24 @@ def register_handlers(app):
     app.add_handler(CommandHandler("broadcast", broadcast_command))
     app.add_handler(CommandHandler("cancel_lunch_date", cancel_lunch_command))
     app.add_handler(CommandHandler("help_admin", help_command))
+    app.add_handler(CommandHandler("backup", backup_command))
     app.add_handler(CommandHandler("karta_raqami", set_card_number_cmd))
     app.add_handler(CommandHandler("karta_egasi",   set_card_owner_cmd))
     
     # ─── 3) ADMIN SHORTCUTS (Reply‑Keyboard Buttons) ──────────────────
-    single_buttons = [
-        (FOYD_BTN,         list_users_exec),
-        (ADD_ADMIN_BTN,    start_add_admin),
-        (REMOVE_ADMIN_BTN, start_remove_admin),
-        (DELETE_USER_BTN,  start_delete_user),
-        (KASSA_BTN,        show_kassa),
-        (MENU_BTN,         menu_panel),
-        (BACK_BTN,         back_to_menu),  # Ortga always goes to menu
-    ]
-    for text, handler in single_buttons:
-        app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(text)}$"), handler))
+    # one exact-match filters.Text handler + dict dispatch instead of seven
+    # regex filters each scanning every incoming text update (mirrors the
+    # user-side button dispatch)
+    app.add_handler(
+        MessageHandler(filters.Text(list(_ADMIN_BTN_DISPATCH)), admin_button_dispatch)
+    )
 
-    # ─── 4) ORTGA SHORTCUT (Reply & Inline) ────────────────────────────
-    app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(BACK_BTN)}$"), back_to_menu))
+    # ─── 4) ORTGA SHORTCUT (Inline) ────────────────────────────────────
     app.add_handler(CallbackQueryHandler(back_to_menu, pattern="^back_to_menu$"))
     app.add_handler(CallbackQueryHandler(admin_panel, pattern="^back_to_admin$"))
   
     # ─── 7) INLINE CALLBACKS FOR USER MGMT ─────────────────────────────
-    app.add_handler(CallbackQueryHandler(add_admin_callback,    pattern=r"^add_admin:\d+$"))
-    app.add_handler(CallbackQueryHandler(remove_admin_callback, pattern=r"^remove_admin:\d+$"))
-    app.add_handler(CallbackQueryHandler(delete_user_callback,  pattern=r"^delete_user:\d+$"))
+    app.add_handler(CallbackQueryHandler(user_mgmt_callback, pattern=USER_MGMT_RE))
 
     # ─── 8) MENU INLINE FLOW & TEXT HANDLER ────────────────────────────
     menu_pattern = r"^(view_menu1|view_menu2|add_menu1|add_menu2|del_menu1|del_menu2|menu_back)$"
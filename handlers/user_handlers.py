@@ -3,7 +3,6 @@
 import logging
 import re
 from datetime import datetime, time
-import pytz
 from telegram.error import BadRequest
 from telegram.constants import ParseMode, ChatAction
 from telegram import (
@@ -30,10 +29,12 @@ from utils import (
     validate_phone,
     get_default_kb,
     get_user_async,
-    get_all_users_async,
 )
+from utils.validation_utils import invalidate_user_cache
+from utils.broadcast_utils import clear_blocked, send_personalized, send_to_many
+from utils.date_utils import TASHKENT_TZ, today_str
 from utils.sheets_utils import find_user_in_sheet
-from handlers.admin_handlers import admin_panel
+from handlers.admin_handlers import admin_panel, get_card_details
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,11 @@ ADMIN_BTN = "🔧 Admin panel"
 CARD_BTN  = "💳 Karta Raqami"
 HISTORY_BTN = "🗓️ Qatnashuv"
 
+# Precompiled once at import; filters.Regex re-evaluates its pattern on every
+# incoming text update, so passing compiled objects avoids recompiling and
+# keeps a single shared pattern per button.
+NAME_RE = re.compile(f"^{re.escape(NAME_BTN)}$", re.UNICODE)
+
 # ─── STATES ───────────────────────────────────
 NAME, PHONE = range(2)
 CHANGE_NAME = 2
@@ -54,8 +60,32 @@ MONTH_NAMES = {
     9: "Sentabr", 10: "Oktabr", 11: "Noyabr", 12: "Dekabr"
 }
 
+# Shared projection for jobs that only need chat ids
+ID_ONLY_PROJ = {"telegram_id": 1, "_id": 0}
+
+# Morning survey keyboard: same Ha/Yo'q buttons for every recipient (the
+# callback carries the responder's id already), so build it once at import
+ATTENDANCE_KB = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Ha", callback_data=YES),
+     InlineKeyboardButton("Yo'q", callback_data=NO)]
+])
+
+# The remaining fixed markups, same reasoning: immutable for the process
+# lifetime, so one instance each instead of a rebuild per call
+CONTACT_KB = ReplyKeyboardMarkup(
+    [[KeyboardButton("Telefon raqamingizni yuboring", request_contact=True)]],
+    resize_keyboard=True,
+)
+CANCEL_CONFIRM_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("✅ Ha, bekor qilaman", callback_data="cancel_yes"),
+    InlineKeyboardButton("❌ Yo‘q",            callback_data="cancel_no")
+]])
+_FOOD_BACK_ROW = [InlineKeyboardButton("🔙 Ortga", callback_data="cancel_attendance")]
+
 # ─── /start & REGISTRATION ────────────────────
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # they clearly unblocked us if they can /start — resume broadcasts
+    await clear_blocked(update.effective_user.id)
     user = await get_user_async(update.effective_user.id)
     if not user:
         await update.message.reply_text(
@@ -76,10 +106,9 @@ async def register_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Ism noto'g'ri. Qaytadan kiriting:")
         return NAME
     context.user_data["name"] = name
-    kb = [[KeyboardButton("Telefon raqamingizni yuboring", request_contact=True)]]
     await update.message.reply_text(
         "Telefon raqamingizni yuboring:",
-        reply_markup=ReplyKeyboardMarkup(kb, resize_keyboard=True)
+        reply_markup=CONTACT_KB
     )
     return PHONE
 
@@ -173,6 +202,7 @@ async def balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     {"telegram_id": tg_id},
                     {"$set": {"balance": bal}}
                 )
+                invalidate_user_cache(tg_id)
                 user.balance = bal
     except Exception as e:
         logger.error(f"Error fetching balance from sheet: {e}")
@@ -188,7 +218,7 @@ async def attendance_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return await update.message.reply_text("❌ Siz ro‘yxatdan o‘tmagansiz.")
 
     # Today in Tashkent
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     today = datetime.now(tz).date()
     current_month = today.month
     current_year = today.year
@@ -241,8 +271,8 @@ async def transaction_history(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # ─── CARD INFO ─────────────────────────────────
 async def show_card_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    card_col = await get_collection("card_details")
-    doc = await card_col.find_one({})
+    # cached in admin_handlers; invalidated when an admin edits the card
+    doc = await get_card_details()
     if not doc:
         return await update.message.reply_text("❌ Karta ma'lumotlari topilmadi.")
     await update.message.reply_text(
@@ -260,7 +290,7 @@ async def menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Iltimos, avval /start bilan ro'yxatdan o'ting."
         )
 
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     today_wd = datetime.now(tz).weekday()
     menu_name = "menu1" if today_wd in (0,2,4) else "menu2"
     menu_col  = await get_collection("menu")
@@ -268,7 +298,7 @@ async def menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     items     = doc.get("items", [])
 
     kb = [[InlineKeyboardButton(i, callback_data=f"food:{i}")] for i in items]
-    kb.append([InlineKeyboardButton("🔙 Ortga", callback_data="cancel_attendance")])
+    kb.append(_FOOD_BACK_ROW)
     await update.message.reply_text(
         "Bugungi taomlar:", reply_markup=InlineKeyboardMarkup(kb)
     )
@@ -278,7 +308,7 @@ async def attendance_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
 
     # ─── CUT-OFF CHECK: no answers after 09:40 ───────────────────
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     now_t = datetime.now(tz).time()
     cutoff = time(9, 40)
     if now_t >= cutoff:
@@ -289,13 +319,13 @@ async def attendance_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await q.answer()
     user = await get_user_async(q.from_user.id)
-    today_str = datetime.now(tz).strftime("%Y-%m-%d")
+    today = today_str()
 
     # ─── NO branch ───────────────────────────────────────────────
     if q.data == NO:
-        if today_str in user.attendance:
-            await user.remove_attendance(today_str)
-        await user.decline_attendance(today_str)
+        if today in user.attendance:
+            await user.remove_attendance(today)
+        await user.decline_attendance(today)
 
         # 1) clear inline
         await q.message.edit_text("❌ Bugungi tushlik rad etildi.")
@@ -310,7 +340,7 @@ async def attendance_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # ─── already said YES ────────────────────────────────────────
-    if today_str in user.attendance:
+    if today in user.attendance:
         # remove inline menu
         await q.message.edit_text(
             f"⚠️ Allaqachon ro'yxatdasiz. Balans: {user.balance:,.0f} so'm."
@@ -324,8 +354,8 @@ async def attendance_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # ─── YES first time → show foods ─────────────────────────────
-    if today_str in user.declined_days:
-        await user.remove_decline(today_str)
+    if today in user.declined_days:
+        await user.remove_decline(today)
 
     wd = datetime.now(tz).weekday()
     menu_name = "menu1" if wd in (0, 2, 4) else "menu2"
@@ -334,7 +364,7 @@ async def attendance_cb(update: Update, context: ContextTypes.DEFAULT_TYPE):
     foods = doc.get("items", [])
 
     kb = [[InlineKeyboardButton(f, callback_data=f"food:{f}")] for f in foods]
-    kb.append([InlineKeyboardButton("🔙 Ortga", callback_data="cancel_attendance")])
+    kb.append(_FOOD_BACK_ROW)
     await q.message.edit_text(
         "🍽 Iltimos, taom tanlang:",
         reply_markup=InlineKeyboardMarkup(kb)
@@ -367,8 +397,7 @@ async def food_selection_cb(update, context):
         pass
 
     # show the cancel tip right away
-    tz = pytz.timezone("Asia/Tashkent")
-    today_str = datetime.now(tz).strftime("%Y-%m-%d")
+    today = today_str()
     await q.message.reply_text(
         "Agar tushlikka qatnashish fikridan voz kechsangiz soat 10:00 gacha "
         "bekor qilishingiz mumkin. Shunchaki /bekor_qilish buyrug‘ini bosing.",
@@ -376,7 +405,7 @@ async def food_selection_cb(update, context):
     )
     import asyncio
     # now fire off the real persistence in the background
-    asyncio.create_task(_persist_choice_and_attendance(user, today_str, food))
+    asyncio.create_task(_persist_choice_and_attendance(user, today, food))
 
 
 async def _persist_choice_and_attendance(user, date_str, food):
@@ -396,12 +425,13 @@ async def _persist_choice_and_attendance(user, date_str, food):
         logging.getLogger(__name__).error("Failed to persist attendance for %s: %s", user.telegram_id, e)
 
 async def get_admin_users_async():
-    users = await get_all_users_async()  # or whatever function returns all users
-    return [u for u in users if u.is_admin]
+    # filter server-side instead of materializing every user and scanning
+    users_col = await get_collection("users")
+    return [User(**doc) async for doc in users_col.find({"is_admin": True})]
 
 async def cancel_lunch(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Entry point for /bekor_qilish"""
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     now = datetime.now(tz)
     today = now.strftime("%Y-%m-%d")
 
@@ -422,20 +452,16 @@ async def cancel_lunch(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("❌ Siz bugun ro‘yxatda emassiz.")
 
     # 4) Ask for confirmation
-    kb = InlineKeyboardMarkup([[
-        InlineKeyboardButton("✅ Ha, bekor qilaman", callback_data="cancel_yes"),
-        InlineKeyboardButton("❌ Yo‘q",            callback_data="cancel_no")
-    ]])
     await update.message.reply_text(
         f"⚠️ {today} uchun tushlik ishtirokini bekor qilmoqchimisiz?",
-        reply_markup=kb
+        reply_markup=CANCEL_CONFIRM_KB
     )
 
 async def cancel_lunch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the confirmation buttons"""
     query = update.callback_query
     await query.answer()
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     today = datetime.now(tz).strftime("%Y-%m-%d")
 
     user = await get_user_async(query.from_user.id)
@@ -479,7 +505,7 @@ async def cancel_lunch_callback(update: Update, context: ContextTypes.DEFAULT_TY
 async def morning_prompt(context: ContextTypes.DEFAULT_TYPE):
     cancelled_lunches = await get_collection("cancelled_lunches")
 
-    tz = pytz.timezone("Asia/Tashkent")
+    tz = TASHKENT_TZ
     now = datetime.now(tz)
     today = now.strftime("%Y-%m-%d")
         
@@ -490,31 +516,43 @@ async def morning_prompt(context: ContextTypes.DEFAULT_TYPE):
     if cancelled:
         # nothing to do today
         return
-    kb = InlineKeyboardMarkup([
-        [InlineKeyboardButton("Ha", callback_data=YES),
-         InlineKeyboardButton("Yo'q", callback_data=NO)]
-    ])
-    for u in await get_all_users_async():
-        await context.bot.send_message(
-            chat_id=u.telegram_id,
-            text="Bugun tushlikka borasizmi?",
-            reply_markup=kb
-        )
+    # one projected read — the prompt only needs chat ids, not full User docs.
+    # Fan out through the rate-limited queue instead of one awaited send per
+    # user, so the whole survey lands in seconds.
+    users_col = await get_collection("users")
+    chat_ids = [
+        doc["telegram_id"] async for doc in users_col.find({}, ID_ONLY_PROJ)
+    ]
+    sent, failed = await send_to_many(
+        context.bot,
+        chat_ids,
+        "Bugun tushlikka borasizmi?",
+        reply_markup=ATTENDANCE_KB,
+    )
+    if failed:
+        logger.warning("Morning prompt: %d sent, %d failed", sent, failed)
 
 async def check_debts(context: ContextTypes.DEFAULT_TYPE):
-    for u in await get_all_users_async():
-        if u.balance < 0:
-            try:
-                await context.bot.send_message(
-                    chat_id=u.telegram_id,
-                    text=(
-                        f"👋 Assalomu alaykum!\n"
-                        f"Sizning balansingizda {abs(u.balance):,.0f} so‘m qarzdorlik mavjud.\n"
-                        "Iltimos, balansingizni to‘ldiring. 🙏"
-                    )
-                )
-            except Exception as e:
-                logger.error(f"Error notifying debt: {e}")
+    # let Mongo filter the debtors instead of scanning every user client-side
+    users_col = await get_collection("users")
+    cursor = users_col.find(
+        {"balance": {"$lt": 0}},
+        {"telegram_id": 1, "balance": 1, "_id": 0}
+    )
+    payloads = [
+        (
+            doc["telegram_id"],
+            (
+                f"👋 Assalomu alaykum!\n"
+                f"Sizning balansingizda {abs(doc['balance']):,.0f} so‘m qarzdorlik mavjud.\n"
+                "Iltimos, balansingizni to‘ldiring. 🙏"
+            ),
+            {},
+        )
+        async for doc in cursor
+    ]
+    # concurrent, rate-limited fan-out; failures are logged by the sender
+    await send_personalized(context.bot, payloads)
 
 
 # ─── ADMIN SHORTCUT ───────────────────────────
@@ -522,6 +560,22 @@ async def admin_button_entry(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await admin_panel(update, context)
 
 
+# ─── BUTTON DISPATCH ──────────────────────────
+# One exact-match lookup per text update instead of a chain of MessageHandlers
+# each running its own regex. NAME_BTN stays a ConversationHandler entry point.
+BUTTON_DISPATCH = {
+    BAL_BTN:     balance,
+    CARD_BTN:    show_card_info,
+    ADMIN_BTN:   admin_panel,
+    HISTORY_BTN: attendance_history,
+}
+
+async def dispatch_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    cb = BUTTON_DISPATCH.get(update.message.text)
+    if cb:
+        await cb(update, context)
+
+
 # ─── REGISTER HANDLERS ────────────────────────
 def register_handlers(app):
     # /start registration
@@ -538,7 +592,7 @@ def register_handlers(app):
 
     # name change
     name_conv = ConversationHandler(
-        entry_points=[MessageHandler(filters.Regex(f"^{re.escape(NAME_BTN)}$"), change_name_start)],
+        entry_points=[MessageHandler(filters.Regex(NAME_RE), change_name_start)],
         states={CHANGE_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, change_name_exec)]},
         fallbacks=[CommandHandler("cancel", cancel)],
         allow_reentry=True,
@@ -554,17 +608,12 @@ def register_handlers(app):
     app.add_handler(CommandHandler("history", transaction_history))
     app.add_handler(CommandHandler("menu", menu))
 
-    # reply‑keyboard shortcuts
-    app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(BAL_BTN)}$"), balance))
-    app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(NAME_BTN)}$"), change_name_start))
-    app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(CARD_BTN)}$"), show_card_info))
-    app.add_handler(MessageHandler(filters.Regex(f"^{re.escape(ADMIN_BTN)}$"), admin_panel))
+    # reply‑keyboard shortcuts: single handler, O(1) dict dispatch.
+    # NAME_BTN is deliberately absent — name_conv above already owns it, and
+    # a second registration would dispatch the same text twice.
     app.add_handler(
-    MessageHandler(
-        filters.Regex(f"^{re.escape(HISTORY_BTN)}$"),
-        attendance_history
+        MessageHandler(filters.Text(list(BUTTON_DISPATCH)), dispatch_button)
     )
-)
 
     # inline callbacks
     app.add_handler(CallbackQueryHandler(attendance_cb, pattern=f"^{YES}$"))
@@ -1,14 +1,22 @@
 from datetime import datetime, timezone
-import pytz
 from bson.objectid import ObjectId
 from database import get_collection
 from config import DEFAULT_DAILY_PRICE, DEFAULT_INITIAL_BALANCE
-from pymongo import ReadPreference
+from pymongo import ReadPreference, ReturnDocument
 import logging
 
 logger = logging.getLogger(__name__)
 
 class User:
+    # Fixed attribute set: dropping the per-instance __dict__ shrinks each
+    # instance, which adds up when jobs materialize one User per registered
+    # user (get_all_users_async, find_all, refund sweeps).
+    __slots__ = (
+        "_id", "telegram_id", "name", "phone", "balance", "daily_price",
+        "attendance", "transactions", "is_admin", "created_at",
+        "declined_days", "debt", "food_choices",
+    )
+
     def __init__(
         self,
         telegram_id: int,
@@ -62,6 +70,9 @@ class User:
             "created_at": datetime.now(timezone.utc),
         }
         await users_col.insert_one(doc)
+        # deferred to avoid a circular import with utils
+        from utils.validation_utils import invalidate_user_cache
+        invalidate_user_cache(telegram_id)
         return cls(**doc)
 
     @classmethod
@@ -75,7 +86,12 @@ class User:
     @staticmethod
     async def find_all():
         users_col = await get_collection("users")
-        async for doc in users_col.with_options(read_preference=ReadPreference.PRIMARY).find({}):
+        cursor = (
+            users_col.with_options(read_preference=ReadPreference.PRIMARY)
+            .find({})
+            .batch_size(200)
+        )
+        async for doc in cursor:
             yield User(**doc)
 
     async def save(self):
@@ -93,6 +109,8 @@ class User:
                 "declined_days": self.declined_days,
             }}
         )
+        from utils.validation_utils import invalidate_user_cache
+        invalidate_user_cache(self.telegram_id)
 
     def _record_txn(self, txn_type: str, amount: int, desc: str):
         """Record a transaction in‑memory; called synchronously."""
@@ -153,8 +171,19 @@ class User:
                 upsert=True
             )
 
-        # 3) persist in Mongo
-        await self.save()
+        # 3) persist in Mongo — one targeted update instead of rewriting the
+        # whole document; the $ne filter makes a concurrent re-run a no-op
+        users_col = await get_collection("users")
+        await users_col.update_one(
+            {"telegram_id": self.telegram_id, "attendance": {"$ne": date_str}},
+            {
+                "$push": {"attendance": date_str,
+                          "transactions": self.transactions[-1]},
+                "$set": {"daily_price": price},
+            },
+        )
+        from utils.validation_utils import invalidate_user_cache
+        invalidate_user_cache(self.telegram_id)
 
         # 4) push only debt to Sheets (rollback on failure)
         ok = await update_attendance_cell_in_sheet(self.telegram_id, price)
@@ -162,7 +191,12 @@ class User:
             # rollback in-memory & DB
             self.attendance.remove(date_str)
             self._record_txn("rollback", price, f"Rollback lunch on {date_str}")
-            await self.save()
+            await users_col.update_one(
+                {"telegram_id": self.telegram_id},
+                {"$pull": {"attendance": date_str},
+                 "$push": {"transactions": self.transactions[-1]}},
+            )
+            invalidate_user_cache(self.telegram_id)
             raise RuntimeError(f"Failed to sync debt for {self.telegram_id}; rolled back")
 
 
@@ -181,14 +215,23 @@ class User:
 
         # 1) remove attendance locally (no balance change here)
         self.attendance.remove(date_str)
-        await self._record_txn("cancel", price, f"Cancel lunch on {date_str}")
+        self._record_txn("cancel", price, f"Cancel lunch on {date_str}")
 
         # 2) remove the food-choice record
         col = await get_collection("daily_food_choices")
         await col.delete_one({"telegram_id": self.telegram_id, "date": date_str})
 
-        # 3) persist in Mongo
-        await self.save()
+        # 3) persist in Mongo — one atomic $pull/$push; the attendance
+        # filter means a double cancel matches nothing the second time
+        users_col = await get_collection("users")
+        await users_col.update_one(
+            {"telegram_id": self.telegram_id, "attendance": date_str},
+            {"$pull": {"attendance": date_str},
+             "$push": {"transactions": self.transactions[-1]},
+             "$set": {"daily_price": price}},
+        )
+        from utils.validation_utils import invalidate_user_cache
+        invalidate_user_cache(self.telegram_id)
 
         # 4) push only debt decrease to Sheets (rollback on failure)
         ok = await clear_attendance_cell_in_sheet(self.telegram_id)
@@ -196,7 +239,12 @@ class User:
             # rollback in-memory & DB
             self.attendance.append(date_str)
             self._record_txn("rollback", -price, f"Rollback cancel on {date_str}")
-            await self.save()
+            await users_col.update_one(
+                {"telegram_id": self.telegram_id},
+                {"$addToSet": {"attendance": date_str},
+                 "$push": {"transactions": self.transactions[-1]}},
+            )
+            invalidate_user_cache(self.telegram_id)
             raise RuntimeError(f"Failed to sync debt rollback for {self.telegram_id}")
 
         
@@ -216,12 +264,15 @@ class User:
         or None if they didn’t pick one.
         """
         col = await get_collection("daily_food_choices")
-        doc = await col.find_one({"telegram_id": self.telegram_id, "date": date})
+        doc = await col.find_one(
+            {"telegram_id": self.telegram_id, "date": date},
+            {"food_choice": 1, "_id": 0}
+        )
         return doc.get("food_choice") if doc else None
     @staticmethod
     async def cleanup_old_food_choices():
-        tz = pytz.timezone("Asia/Tashkent")
-        today = datetime.now(tz).strftime("%Y-%m-%d")
+        from utils.date_utils import TASHKENT_TZ
+        today = datetime.now(TASHKENT_TZ).strftime("%Y-%m-%d")
         col = await get_collection("daily_food_choices")
         await col.delete_many({"date": {"$lt": today}})
 
@@ -231,9 +282,25 @@ class User:
         await self.save()
 
     async def update_balance(self, amount: int, desc: str = "Balance adjustment"):
-        self.balance += amount
+        # atomic $inc + $push: no read-modify-write window against concurrent
+        # updates, and one round-trip instead of rewriting the whole document
         self._record_txn("balance", amount, desc)
-        await self.save()
+        users_col = await get_collection("users")
+        doc = await users_col.find_one_and_update(
+            {"telegram_id": self.telegram_id},
+            {
+                "$inc": {"balance": amount},
+                "$push": {"transactions": self.transactions[-1]},
+            },
+            projection={"balance": 1, "_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            self.balance = doc["balance"]
+        else:
+            self.balance += amount
+        from utils.validation_utils import invalidate_user_cache
+        invalidate_user_cache(self.telegram_id)
 
     async def promote_to_admin(self):
         self.is_admin = True
@@ -0,0 +1,159 @@
+# utils/broadcast_utils.py
+
+"""
+Concurrent fan-out of Telegram messages.
+
+Sends go through a bounded asyncio.Queue drained by a fixed pool of
+workers, each taking a token from a module-wide bucket before calling the
+API. The bucket is shared across broadcasts, so overlapping fan-outs
+(e.g. a cancellation notice landing during the morning prompt) still sum
+to Telegram's ~30 msg/s global limit instead of bursting into 429s.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from telegram.error import Forbidden, RetryAfter
+
+from database import get_collection
+
+logger = logging.getLogger(__name__)
+
+# Stay a little under Telegram's 30 msg/s global cap
+MESSAGES_PER_SECOND = 25
+MAX_CONCURRENT_SENDS = 25
+# backpressure: producers stall instead of materializing huge payload lists
+_QUEUE_DEPTH = 500
+
+
+class _TokenBucket:
+    """Classic token bucket; refills continuously at `rate` tokens/sec."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            self.tokens = 0.0
+            self.updated = now + wait
+        await asyncio.sleep(wait)
+
+
+# one bucket for the whole process — every broadcast draws from it
+_bucket = _TokenBucket(MESSAGES_PER_SECOND, MAX_CONCURRENT_SENDS)
+
+# Chat ids that returned Forbidden (user blocked the bot). Each entry
+# saves a doomed ~200ms HTTP round-trip per broadcast, so skip them
+# before spending a rate-limit token. Mirrored to the blocked_users
+# collection so the set survives restarts.
+_blocked: set = set()
+_blocked_loaded = False
+
+
+async def _ensure_blocked_loaded():
+    global _blocked_loaded
+    if _blocked_loaded:
+        return
+    col = await get_collection("blocked_users")
+    async for doc in col.find({}, {"telegram_id": 1, "_id": 0}):
+        _blocked.add(doc["telegram_id"])
+    _blocked_loaded = True
+
+
+async def _mark_blocked(chat_id):
+    _blocked.add(chat_id)
+    col = await get_collection("blocked_users")
+    await col.update_one(
+        {"telegram_id": chat_id},
+        {"$set": {"blocked_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+async def clear_blocked(chat_id):
+    """Forget a recorded block — call when the user talks to the bot again."""
+    # no membership guard: the in-memory set is only loaded lazily by the
+    # first broadcast, so after a restart the persisted record must be
+    # deleted even when the set hasn't seen this id yet
+    _blocked.discard(chat_id)
+    col = await get_collection("blocked_users")
+    await col.delete_one({"telegram_id": chat_id})
+
+
+async def send_personalized(bot, payloads) -> tuple:
+    """
+    Send per-recipient messages through the rate-limited queue; returns
+    (sent, failed).
+
+    `payloads` yields (chat_id, text, send_kwargs) triples. Failures are
+    counted and logged but never abort the batch.
+    """
+    await _ensure_blocked_loaded()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_DEPTH)
+    sent = failed = 0
+
+    async def worker():
+        nonlocal sent, failed
+        while True:
+            job = await queue.get()
+            if job is None:
+                return
+            chat_id, text, send_kwargs = job
+            if chat_id in _blocked:
+                continue
+            await _bucket.acquire()
+            try:
+                await bot.send_message(chat_id, text, **send_kwargs)
+                sent += 1
+            except RetryAfter as e:
+                # Telegram told us exactly how long to back off — honor it
+                # and give this one send a second try
+                await asyncio.sleep(e.retry_after)
+                try:
+                    await bot.send_message(chat_id, text, **send_kwargs)
+                    sent += 1
+                except Exception as exc:
+                    logger.warning(
+                        "Broadcast to %s failed after retry: %s", chat_id, exc
+                    )
+                    failed += 1
+            except Forbidden:
+                # the user blocked the bot — remember it instead of
+                # retrying them on every future broadcast
+                await _mark_blocked(chat_id)
+                failed += 1
+            except Exception as e:
+                logger.warning("Broadcast to %s failed: %s", chat_id, e)
+                failed += 1
+
+    workers = [
+        asyncio.ensure_future(worker()) for _ in range(MAX_CONCURRENT_SENDS)
+    ]
+    for payload in payloads:
+        await queue.put(payload)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return sent, failed
+
+
+async def send_to_many(bot, chat_ids, text, **send_kwargs) -> tuple:
+    """Send the same `text` to every chat id concurrently; returns (sent, failed)."""
+    return await send_personalized(
+        bot, ((cid, text, send_kwargs) for cid in chat_ids)
+    )
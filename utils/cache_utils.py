@@ -0,0 +1,44 @@
+# utils/cache_utils.py
+
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small in-process TTL + LRU cache for hot MongoDB lookups.
+
+    Entries expire `ttl` seconds after being set; once `maxsize` live
+    entries exist, the least-recently-used one is evicted. Not thread-safe,
+    but the bot runs on a single asyncio loop so plain dict ops are fine.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 512, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, self._MISSING)
+        if entry is self._MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
@@ -0,0 +1,31 @@
+# utils/date_utils.py
+
+"""
+Shared Tashkent-time helpers.
+
+Almost every handler needs "today" as a YYYY-MM-DD string in Asia/Tashkent;
+today_str() formats it once per calendar day instead of running strftime on
+every update.
+"""
+
+from datetime import datetime
+
+import pytz
+
+TASHKENT_TZ = pytz.timezone("Asia/Tashkent")
+
+_today_cache = (None, "")
+
+
+def now_tashkent() -> datetime:
+    """Current aware datetime in Asia/Tashkent."""
+    return datetime.now(TASHKENT_TZ)
+
+
+def today_str() -> str:
+    """Today's date in Asia/Tashkent as YYYY-MM-DD, cached per day."""
+    global _today_cache
+    today = datetime.now(TASHKENT_TZ).date()
+    if _today_cache[0] != today:
+        _today_cache = (today, today.strftime("%Y-%m-%d"))
+    return _today_cache[1]
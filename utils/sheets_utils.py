@@ -1,14 +1,18 @@
 # utils/sheets_utils.py
 
 import os
+import re
 import json
+import random
+from datetime import datetime
 import gspread
 import logging
 import asyncio
 import pymongo
+from gspread.exceptions import APIError
 from google.oauth2.service_account import Credentials
 from functools import wraps
-from database import users_col, get_collection
+from database import get_collection
 from telegram.ext import ContextTypes
 
 logger = logging.getLogger(__name__)
@@ -21,6 +25,20 @@ SHEET_NAME = "tushlik"
 WORKSHEET_NAME = "Sheet1"
 
 
+# Sheet cells arrive as strings like "25,000" or "25 000". One compiled
+# pre-check keeps bad cells off the float() raise/except path, which is the
+# common case when someone fat-fingers a cell.
+_NUM_RE = re.compile(r"\A-?[\d\s,]*\d(?:\.\d+)?\Z")
+
+
+def parse_sheet_number(raw, default: float | None = None) -> float | None:
+    """Parse a numeric sheet cell ("25,000" etc.); `default` when malformed."""
+    s = str(raw).strip()
+    if not _NUM_RE.match(s):
+        return default
+    return float(s.replace(",", "").replace(" ", ""))
+
+
 def get_creds():
     creds_json = os.environ["GOOGLE_CREDENTIALS_JSON"]
     creds_dict = json.loads(creds_json)
@@ -36,6 +54,17 @@ def to_async(func):
     return wrapper
 
 
+async def _call_blocking(func, *args, **kwargs):
+    """
+    Run one blocking worksheet call (get_all_records, find, update_cell…)
+    in the executor. Each of these is a synchronous HTTP round-trip plus
+    response parsing, which would otherwise stall every other handler for
+    its full duration.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+
+
 @to_async
 def _open_worksheet(sheet_name: str = WORKSHEET_NAME):
     gc = gspread.authorize(get_creds())
@@ -43,41 +72,71 @@ def _open_worksheet(sheet_name: str = WORKSHEET_NAME):
     return sh.worksheet(sheet_name)
 
 async def get_worksheet(sheet_name: str = WORKSHEET_NAME):
-    """Async handle to any worksheet in the spreadsheet."""
-    return await _open_worksheet(sheet_name)
+    """
+    Async handle to any worksheet in the spreadsheet.
+
+    Retries transient Sheets API errors (rate limits, 5xx) with
+    exponential backoff plus jitter, so concurrent retries don't all
+    hammer the API at the same instant.
+    """
+    delay = 1.0
+    for attempt in range(3):
+        try:
+            return await _open_worksheet(sheet_name)
+        except APIError as e:
+            if attempt == 2:
+                raise
+            logger.warning("Sheets API error (attempt %d): %s", attempt + 1, e)
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay *= 2
 
 async def find_user_in_sheet(telegram_id: int) -> dict | None:
     """Return the entire row dict for this user, or None."""
     ws = await get_worksheet()
     if not ws:
         return None
-    for rec in ws.get_all_records():
+    for rec in await _call_blocking(ws.get_all_records):
         if str(rec.get("telegram_id")) == str(telegram_id):
             return rec
     return None
 
 async def sync_balances_from_sheet(context: ContextTypes.DEFAULT_TYPE = None) -> dict:
     """
-    Full‐sheet sync: read EVERY row’s `balance` and overwrite Mongo.
+    Full‐sheet sync: read EVERY row’s `balance` and write the deltas to Mongo.
     """
     ws = await get_worksheet()
     if not ws:
         return {"success": False, "error": "no worksheet"}
-    updated = errors = 0
+    users_col = await get_collection("users")
+    errors = 0
 
-    for row in ws.get_all_records():
-        try:
-            tid = int(row.get("telegram_id"))
-            bal = float(str(row.get("balance", 0)).replace(",", ""))
-            res = await users_col.update_one(
-                {"telegram_id": tid},
-                {"$set": {"balance": bal}}
-            )
-            if res.modified_count:
-                updated += 1
-        except Exception as e:
-            logger.error("sync_balances_from_sheet error on row %r: %s", row, e)
+    # snapshot current balances once; rows that already match produce no
+    # op, so the bulk_write payload shrinks to the actual delta
+    db_map = {
+        u["telegram_id"]: u.get("balance")
+        async for u in users_col.find({}, {"telegram_id": 1, "balance": 1, "_id": 0})
+    }
+
+    ops = []
+    for row in await _call_blocking(ws.get_all_records):
+        tid = parse_sheet_number(row.get("telegram_id"))
+        bal = parse_sheet_number(row.get("balance", 0))
+        if tid is None or bal is None:
+            logger.error("sync_balances_from_sheet error on row %r", row)
             errors += 1
+            continue
+        tid = int(tid)
+        if db_map.get(tid) == bal:
+            continue
+        ops.append(pymongo.UpdateOne(
+            {"telegram_id": tid},
+            {"$set": {"balance": bal}}
+        ))
+
+    updated = 0
+    if ops:
+        res = await users_col.bulk_write(ops, ordered=False)
+        updated = res.modified_count
 
     return {"success": True, "updated": updated, "errors": errors}
 
@@ -95,18 +154,18 @@ async def sync_balances_incremental() -> list[int]:
     db_map = {u["telegram_id"]: u["balance"] for u in db_users}
 
     ws = await get_worksheet()
-    rows = ws.get_all_records()
+    rows = await _call_blocking(ws.get_all_records)
 
     updates = []
     for row in rows:
         raw_id = row.get("telegram_id")
         if not raw_id:
             continue
-        try:
-            tg_id = int(raw_id)
-            bal_sheet = float(str(row.get("balance", 0)).replace(",", ""))
-        except Exception:
+        tg_id = parse_sheet_number(raw_id)
+        bal_sheet = parse_sheet_number(row.get("balance", 0))
+        if tg_id is None or bal_sheet is None:
             continue
+        tg_id = int(tg_id)
         bal_db = db_map.get(tg_id)
         if bal_db is not None and bal_db != bal_sheet:
             updates.append((tg_id, bal_sheet))
@@ -127,14 +186,15 @@ async def get_balance_from_sheet(telegram_id: int) -> float:
     ws = await get_worksheet()
     if not ws:
         raise RuntimeError("Worksheet not available")
-    
-    for row in ws.get_all_records():
-        try:
-            if int(row.get("telegram_id")) == telegram_id:
-                return float(str(row.get("balance", 0)).replace(",", ""))
-        except Exception as e:
-            logger.error(f"Error parsing row for user {telegram_id}: {e}")
+
+    for row in await _call_blocking(ws.get_all_records):
+        tid = parse_sheet_number(row.get("telegram_id"))
+        if tid is None or int(tid) != telegram_id:
             continue
+        bal = parse_sheet_number(row.get("balance", 0))
+        if bal is not None:
+            return bal
+        logger.error(f"Error parsing balance for user {telegram_id}: {row!r}")
 
     raise ValueError(f"No balance found in sheet for telegram_id={telegram_id}")
 
@@ -143,8 +203,8 @@ async def get_price_from_sheet(telegram_id: int) -> float:
     Look up this user’s `daily_price` (column E) live from the sheet.
     """
     ws = await get_worksheet()
-    cell = ws.find(str(telegram_id), in_column=2)
-    raw = ws.cell(cell.row, 5).value  # 1-based
+    cell = await _call_blocking(ws.find, str(telegram_id), in_column=2)
+    raw = (await _call_blocking(ws.cell, cell.row, 5)).value  # 1-based
     return float(raw.replace(",", "").strip())
 
 
@@ -155,31 +215,35 @@ async def sync_prices_from_sheet(context: ContextTypes.DEFAULT_TYPE = None) -> d
     ws = await get_worksheet()
     if not ws:
         return {"success": False, "error": "could not open worksheet"}
-    updated = errors = 0
+    users_col = await get_collection("users")
+    errors = 0
 
-    for row in ws.get_all_records():
-        try:
-            tid   = int(row.get("telegram_id", 0))
-            price = float(str(row.get("daily_price", 0)).replace(",", "").strip())
-            res = await users_col.update_one(
-                {"telegram_id": tid},
-                {"$set": {"daily_price": price}}
-            )
-            if res.modified_count:
-                updated += 1
-        except Exception as e:
-            logger.error("sync_prices_from_sheet error on row %r: %s", row, e)
+    ops = []
+    for row in await _call_blocking(ws.get_all_records):
+        tid   = parse_sheet_number(row.get("telegram_id", 0))
+        price = parse_sheet_number(row.get("daily_price", 0))
+        if tid is None or price is None:
+            logger.error("sync_prices_from_sheet error on row %r", row)
             errors += 1
+            continue
+        ops.append(pymongo.UpdateOne(
+            {"telegram_id": int(tid)},
+            {"$set": {"daily_price": price}}
+        ))
+
+    updated = 0
+    if ops:
+        res = await users_col.bulk_write(ops, ordered=False)
+        updated = res.modified_count
 
     return {"success": True, "updated": updated, "errors": errors}
 
-from datetime import datetime
 async def update_attendance_cell_in_sheet(telegram_id: int, value: int):
     """Marks a cell in the 'Attendance' sheet for today's column."""
     ws = await get_worksheet("Attendance")
-    all_data = ws.get_all_records()
-    headers = ws.row_values(1)
-    
+    all_data = await _call_blocking(ws.get_all_records)
+    headers = await _call_blocking(ws.row_values, 1)
+
     # Step 1: Find user row
     row_num = None
     for idx, row in enumerate(all_data, start=2):  # Header is row 1
@@ -193,13 +257,14 @@ async def update_attendance_cell_in_sheet(telegram_id: int, value: int):
     # Step 2: Find today's column
     today = f"{datetime.now().month}/{datetime.now().day}"
     if today not in headers:
-        ws.update_cell(1, len(headers) + 1, today)  # Add today's column if missing
+        # Add today's column if missing
+        await _call_blocking(ws.update_cell, 1, len(headers) + 1, today)
         col_num = len(headers) + 1
     else:
         col_num = headers.index(today) + 1
-    
+
     # Step 3: Write attendance
-    ws.update_cell(row_num, col_num, value)
+    await _call_blocking(ws.update_cell, row_num, col_num, value)
 
 async def clear_attendance_cell_in_sheet(telegram_id: int):
     """Clears today's attendance cell for a user in the Attendance sheet."""
@@ -1,21 +1,61 @@
 # validation_utils.py
 
+import asyncio
 import re
 from typing import Optional, List
 from telegram import ReplyKeyboardMarkup
 from models.user_model import User
 from database import get_collection
+from utils.cache_utils import TTLCache
 from datetime import datetime, timezone
 
+# Raw user docs keyed by telegram_id; short TTL keeps reads hot without
+# letting balance edits go unseen for long.
+_user_cache = TTLCache(maxsize=512, ttl=30.0)
+
+# Admin membership changes minutes-to-days apart, so a 60s TTL turns the
+# per-update Mongo check into a dict lookup.
+_admin_cache = TTLCache(maxsize=1024, ttl=60.0)
+
+# Cached marker for "user does not exist", so repeated lookups of
+# unregistered ids don't each hit Mongo.
+_NO_USER = object()
+
+# telegram_id -> in-flight fetch task, so concurrent lookups of the same
+# user coalesce into one query.
+_inflight: dict = {}
+
+
+def invalidate_user_cache(telegram_id: int):
+    """Drop one user's cached doc (and admin flag) after a write touching them."""
+    _user_cache.invalidate(telegram_id)
+    _admin_cache.invalidate(telegram_id)
+
+
+async def _fetch_user_doc(telegram_id: int):
+    users_col = await get_collection("users")
+    doc = await users_col.find_one({
+        "$or": [
+            {"telegram_id": telegram_id},
+            {"user_id": telegram_id},
+        ]
+    })
+    _user_cache.set(telegram_id, doc if doc else _NO_USER)
+    return doc
+
 _NAME_RE = re.compile(r"^[A-Za-z\u0400-\u04FF'][A-Za-z\u0400-\u04FF' ]{1,49}$")
 _PHONE_RE = re.compile(r"^\+?998\d{9}$")
+_PHONE_CLEAN_RE = re.compile(r"[^\d+]")
+
+# Hot-path query documents built once instead of per call
+_ADMIN_FILTER = {"is_admin": True}
 
 def validate_name(name: str) -> bool:
     return bool(_NAME_RE.fullmatch(name.strip()))
 
 def validate_phone(phone: str) -> bool:
     # Remove any non-digit characters except + at the start
-    cleaned = re.sub(r'[^\d+]', '', phone)
+    cleaned = _PHONE_CLEAN_RE.sub('', phone)
     # Ensure leading +
     if not cleaned.startswith('+'):
         cleaned = '+' + cleaned
@@ -24,29 +64,46 @@ def validate_phone(phone: str) -> bool:
 async def any_admins_exist() -> bool:
     """Return True if any admin users exist."""
     users_col = await get_collection("users")
-    count = await users_col.count_documents({"is_admin": True}, limit=1)
+    count = await users_col.count_documents(_ADMIN_FILTER, limit=1)
     return count > 0
 
+# Only four (is_admin, has_food_selection) variants exist and the markup is
+# immutable once sent, so build each lazily and reuse the instance — this
+# keyboard goes out with nearly every reply.
+_default_kbs: dict = {}
+
 def get_default_kb(is_admin: bool, has_food_selection: bool = False) -> ReplyKeyboardMarkup:
     """Build the standard user keyboard."""
-    row1 = ["💸 Balansim", "✏️ Ism o'zgartirish"]
-    row2 = ["💳 Karta Raqami", "🗓️ Qatnashuv" ]
-    row3 = []
-    if has_food_selection:
-        row3.append("❌ Tushlikni bekor qilish")
-    if is_admin:
-        row1.append("🔧 Admin panel")
-    return ReplyKeyboardMarkup([row1, row2], resize_keyboard=True)
+    key = (is_admin, has_food_selection)
+    kb = _default_kbs.get(key)
+    if kb is None:
+        row1 = ["💸 Balansim", "✏️ Ism o'zgartirish"]
+        row2 = ["💳 Karta Raqami", "🗓️ Qatnashuv" ]
+        row3 = []
+        if has_food_selection:
+            row3.append("❌ Tushlikni bekor qilish")
+        if is_admin:
+            row1.append("🔧 Admin panel")
+        kb = ReplyKeyboardMarkup([row1, row2], resize_keyboard=True)
+        _default_kbs[key] = kb
+    return kb
 
 async def get_user_async(telegram_id: int) -> Optional[User]:
     """Fetch a User by telegram_id (or legacy user_id) and return a User object."""
-    users_col = await get_collection("users")
-    doc = await users_col.find_one({
-        "$or": [
-            {"telegram_id": telegram_id},
-            {"user_id": telegram_id},
-        ]
-    })
+    doc = _user_cache.get(telegram_id)
+    if doc is _NO_USER:
+        return None
+    if doc is None:
+        task = _inflight.get(telegram_id)
+        if task is None:
+            task = asyncio.ensure_future(_fetch_user_doc(telegram_id))
+            _inflight[telegram_id] = task
+            try:
+                doc = await task
+            finally:
+                _inflight.pop(telegram_id, None)
+        else:
+            doc = await task
     if not doc:
         return None
 
@@ -72,7 +129,8 @@ async def get_user_async(telegram_id: int) -> Optional[User]:
 async def get_all_users_async() -> List[User]:
     """Fetch all users and return a list of User objects."""
     users_col = await get_collection("users")
-    cursor = users_col.find({})
+    # larger batches cut getMore round-trips when iterating the whole collection
+    cursor = users_col.find({}).batch_size(200)
     users: List[User] = []
 
     async for doc in cursor:
@@ -98,6 +156,14 @@ async def get_all_users_async() -> List[User]:
 
 async def is_admin(telegram_id: int) -> bool:
     """Return True if the given telegram_id belongs to an admin."""
+    cached = _admin_cache.get(telegram_id)
+    if cached is not None:
+        return cached
     users_col = await get_collection("users")
-    doc = await users_col.find_one({"telegram_id": telegram_id})
-    return bool(doc and doc.get("is_admin", False))
+    # server-side existence check: no document crosses the wire at all
+    count = await users_col.count_documents(
+        {"telegram_id": telegram_id, "is_admin": True}, limit=1
+    )
+    result = count > 0
+    _admin_cache.set(telegram_id, result)
+    return result